@@ -31,12 +31,32 @@ class LsiSearch():
 
     WORK_COUNT_FACTOR = .01
 
-    def __init__(self):
+    # storage (and scoring) precision for the projected weights
+    PRECISIONS = ('float64', 'float32', 'int8')
+    INT8_MAX = 127
+    # when re-ranking, this many times the requested results are re-scored in float64
+    RERANK_FACTOR = 2
+
+    def __init__(self, precision='float64', rerank=False):
+        """ Initialize the search
+
+        :precision: one of PRECISIONS, float32 and int8 trade ranking accuracy for memory
+        :rerank:    re-score the best reduced precision results in float64
+        """
+        if precision not in self.PRECISIONS:
+            raise ValueError("LsiSearch -- invalid precision (%s)" % precision)
+        self.precision = precision
+        self.rerank = rerank
         self.csv_list = []
         self.employee_ids = []
         self.eigen_space = []
         self.k_limit = 0
         self.weights = []
+        # per-vector scales for int8 weights (weights * scale approximates the float64 weights)
+        # cosine scores do not depend on a vector's scale, so searches never read these,
+        #  they are only kept so the stored weights can be dequantized
+        self.weight_scales = None
+        self.weight_norms = None
 
     def read_csv(self, hist_data_stream):
         """ Read a CSV file and return a list of lists
@@ -222,6 +242,46 @@ class LsiSearch():
             weights.append(new_weight)
         return weights
 
+    def quantize_weights(self, weights):
+        """ Take a matrix of weights and store it in the reduced precision
+
+        :weights:   the float64 weights (from generate_weights)
+        :returns:   the reduced precision weights,
+                    the per-vector scales (None unless int8),
+                    the per-vector norms
+        """
+        weights = numpy.array(weights, dtype=numpy.float64)
+        scales = None
+        if self.precision == 'int8':
+            scales = numpy.abs(weights).max(axis=1) / self.INT8_MAX
+            scales[scales == 0] = 1
+            weights = numpy.rint(weights / scales[:, numpy.newaxis]).astype(numpy.int8)
+            scales = scales.astype(numpy.float32)
+        else:
+            weights = weights.astype(numpy.float32)
+        # int8 squares are summed as int32 to avoid overflow
+        squares = numpy.square(weights, dtype=(numpy.int32 if self.precision == 'int8' else numpy.float32))
+        norms = numpy.sqrt(squares.sum(axis=1), dtype=numpy.float32)
+        return weights, scales, norms
+
+    def cosine_similarity(self, weights_a, weights_b):
+        """ Take two weight vectors and return their cosine similarity (0 if either is empty)
+
+        :weights_a: the first weight vector
+        :weights_b: the second weight vector
+        :returns:   the cosine similarity
+        """
+        numerator = 0
+        denominatorA = 0
+        denominatorB = 0
+        for index in xrange(0, len(weights_a)):
+            numerator += weights_a[index] * weights_b[index]
+            denominatorA += weights_a[index] * weights_a[index]
+            denominatorB += weights_b[index] * weights_b[index]
+        if denominatorA and denominatorB:
+            return numerator / (math.sqrt(denominatorA) * math.sqrt(denominatorB))
+        return 0
+
     def perform_search(self, search_schedule, result_count, csv_list, employee_ids, eigen_space, k_limit, weights):
         """ Take an eigenspace, the pre-calculated example weights, a search query and return search results
 
@@ -254,17 +314,7 @@ class LsiSearch():
         answer_index = 0
         results = []
         for idx, weight_vector in enumerate(weights):
-            numerator = 0
-            denominatorA = 0
-            denominatorB = 0
-            for index in xrange(0, k_limit):
-                numerator += search_weights[index] * weight_vector[index]
-                denominatorA += search_weights[index] * search_weights[index]
-                denominatorB += weight_vector[index] * weight_vector[index]
-            if denominatorA and denominatorB:
-                total_score = numerator / (math.sqrt(denominatorA) * math.sqrt(denominatorB))
-            else:
-                total_score = 0
+            total_score = self.cosine_similarity(search_weights, weight_vector)
 
             # print idx, characters[idx], weight_vector[index], total_score, max_score
             if total_score >= (max_score - 0.02):
@@ -289,6 +339,107 @@ class LsiSearch():
         # TODO: compare results against a simple cartesian distance of the search terms to each of the known results
         #
 
+    def perform_reduced_search(self, search_schedule, result_count, csv_list, employee_ids, eigen_space, k_limit,
+                               weights, weight_norms):
+        """ Same as perform_search, but scores reduced precision (float32 or int8) weights
+
+        The per-vector int8 scales cancel out of the cosine similarity, so they are not needed for scoring
+
+        :search_schedule:   the search query
+        :result_count:      limit results to this (may be less than or equal to this)
+        :csv_list:          the original historical examples
+        :employee_ids:      employee ids for the original historical examples
+        :eigen_space:       the eigenspace
+        :k_limit:           the number of eigen values
+        :weights:           the known cases projected onto the eigenspace (from quantize_weights)
+        :weight_norms:      the norms of the weights (from quantize_weights)
+        :returns:           the search results
+        """
+        test_array = numpy.array([
+            search_schedule.work_day,
+            search_schedule.work_shift,
+            search_schedule.work_type,
+            1,  # worked = true
+            1,  # worked count = 100
+            0, 0, 0, 0
+        ])
+        eigen_vectors = numpy.asarray(eigen_space[:k_limit])
+        search_weights = eigen_vectors.dot(test_array)
+
+        # approach: cosine similarity
+        if self.precision == 'int8':
+            # quantize the query too, so the int8 weights are read as int8 (and summed as int32)
+            search_scale = (numpy.abs(search_weights).max() / self.INT8_MAX) or 1
+            search_weights = numpy.rint(search_weights / search_scale).astype(numpy.int8)
+            numerators = numpy.einsum('ij,j->i', weights, search_weights, dtype=numpy.int32)
+            search_norm = numpy.sqrt(numpy.square(search_weights, dtype=numpy.int32).sum(), dtype=numpy.float32)
+        else:
+            search_weights = search_weights.astype(numpy.float32)
+            numerators = weights.dot(search_weights)
+            search_norm = numpy.sqrt(search_weights.dot(search_weights))
+        denominators = weight_norms * search_norm
+        scores = numpy.zeros(len(weights), dtype=numpy.float32)
+        numpy.divide(numerators, denominators, out=scores, where=(denominators != 0))
+
+        # keep the same running selection as perform_search
+        max_score = -999999
+        results = []
+        for idx, total_score in enumerate(scores.tolist()):
+            if total_score >= (max_score - 0.02):
+                max_score = total_score
+                results.append(SearchResult(
+                    score=total_score,
+                    index=(idx + 2),
+                    employee=employee_ids[idx],
+                    work_day=csv_list[idx][0],
+                    work_shift=csv_list[idx][1],
+                    work_type=csv_list[idx][2],
+                    worked=csv_list[idx][3],
+                    worked_count=csv_list[idx][4]
+                ))
+
+        results = sorted(results, key=attrgetter('score'), reverse=True)
+        if not self.rerank or not results:
+            return results[:result_count]
+
+        # re-score the best candidates exactly, projecting all their rows with one dot
+        candidates = results[:(result_count * self.RERANK_FACTOR)]
+        rows = numpy.array([csv_list[result.index - 2] for result in candidates], dtype=numpy.float64)
+        row_weights = rows.dot(eigen_vectors.transpose())
+        search_weights = eigen_vectors.dot(test_array)
+        numerators = row_weights.dot(search_weights)
+        search_norm = numpy.sqrt(search_weights.dot(search_weights))
+        denominators = numpy.sqrt(numpy.square(row_weights).sum(axis=1)) * search_norm
+        exact_scores = numpy.zeros(len(candidates))
+        numpy.divide(numerators, denominators, out=exact_scores, where=(denominators != 0))
+        reranked = [result._replace(score=score) for result, score in zip(candidates, exact_scores.tolist())]
+        return sorted(reranked, key=attrgetter('score'), reverse=True)[:result_count]
+
+    def ranking_agreement(self, hist_data_stream, search_schedules, result_count):
+        """ Measure how closely this search's results match the float64 search
+
+        :hist_data_stream:  the csv containing historical shift data
+        :search_schedules:  the schedules to search for
+        :result_count:      the maximum number of results per search
+        :returns:           the mean share of float64 results which this search also returns
+                            (1.0 is full agreement)
+        """
+        if not self.csv_list or not self.employee_ids:
+            self.csv_list, self.employee_ids = self.read_csv(hist_data_stream)
+        reference = LsiSearch()
+        reference.csv_list, reference.employee_ids = self.csv_list, self.employee_ids
+
+        shares = []
+        for search_schedule in search_schedules:
+            expected = set(result.index for result in reference.find_in_csv(None, search_schedule, result_count))
+            if not expected:
+                continue
+            actual = set(result.index for result in self.find_in_csv(None, search_schedule, result_count))
+            shares.append(len(expected & actual) / float(len(expected)))
+        if not shares:
+            return 1.0
+        return sum(shares) / len(shares)
+
     def find_in_csv(self, hist_data_stream, search_schedule, result_count):
         """ Take a csv file with historical data and a schedule search
             and calculate the employee most suited for the schedule
@@ -302,11 +453,24 @@ class LsiSearch():
         """
         if not self.csv_list or not self.employee_ids:
             self.csv_list, self.employee_ids = self.read_csv(hist_data_stream)
-        if self.k_limit == 0 or not self.weights:
+        if self.k_limit == 0 or not len(self.weights):
             csv_list_centered, csv_list_means = self.center_matrix(self.csv_list)
             self.eigen_space, eigen_values = self.create_eigenspace(csv_list_centered)
             self.k_limit = len(eigen_values)
             self.weights = self.generate_weights(self.k_limit, self.eigen_space, self.csv_list)
+            if self.precision != 'float64':
+                self.weights, self.weight_scales, self.weight_norms = self.quantize_weights(self.weights)
+        if self.precision != 'float64':
+            return self.perform_reduced_search(
+                search_schedule,
+                result_count,
+                self.csv_list,
+                self.employee_ids,
+                self.eigen_space,
+                self.k_limit,
+                self.weights,
+                self.weight_norms
+            )
         results = self.perform_search(
             search_schedule,
             result_count,
@@ -349,6 +513,13 @@ if __name__ == "__main__":
                         type=argparse.FileType('r'),
                         default=sys.stdin,
                         help="CSV file with historical data (or stdin)")
+    parser.add_argument("--precision",
+                        choices=LsiSearch.PRECISIONS,
+                        default='float64',
+                        help="Precision used to store and score the projected weights")
+    parser.add_argument("--rerank",
+                        action='store_true',
+                        help="Re-score the best reduced precision matches in float64")
     args = parser.parse_args()
     search_schedule = Schedule(
         work_day=int(args.work_day),
@@ -357,4 +528,5 @@ if __name__ == "__main__":
         worked=1,
         employee_id=0
     )
-    LsiSearch().find_in_csv_and_print(args.historical_data_file, search_schedule, int(args.result_count))
+    lsi = LsiSearch(args.precision, args.rerank)
+    lsi.find_in_csv_and_print(args.historical_data_file, search_schedule, int(args.result_count))
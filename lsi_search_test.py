@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from StringIO import StringIO
+
+from lsi_search import Schedule, LsiSearch
+from work_types import WorkTypes
+
+# every search engine must agree with the reference LsiSearch.perform_search on these histories
+HISTORY_SEEDS = range(5)
+RESULT_COUNT = 10
+
+# engine name => (engine factory, score tolerance)
+SEARCH_ENGINES = {
+    'float32': (lambda: LsiSearch('float32'), 1e-5),
+    'float32-rerank': (lambda: LsiSearch('float32', True), 1e-9),
+}
+# engine name => (engine factory, score tolerance, minimum mean share of reference rows found)
+# (small score errors change which rows perform_search's running cutoff keeps, so these only have to mostly agree)
+APPROXIMATE_SEARCH_ENGINES = {
+    'int8': (lambda: LsiSearch('int8'), 3e-2, 0.97),
+    'int8-rerank': (lambda: LsiSearch('int8', True), 1e-9, 0.99),
+}
+
+
+def generate_history(seed, row_count=120, employee_count=16):
+    """ Generate random historical shift data
+
+    :seed:              seed for the random generator
+    :row_count:         number of CSV rows (repeated rows raise the worked count)
+    :employee_count:    number of employees
+    :returns:           the CSV text
+    """
+    rand = random.Random(seed)
+    work_types = sorted(WorkTypes().map)
+    employees = ['E{:03d}'.format(i) for i in xrange(employee_count)]
+    lines = ['work_day,work_shift,work_type,worked,employee_id']
+    for i in xrange(row_count):
+        lines.append('{},{},{},{},{}'.format(
+            rand.randint(1, 7),
+            rand.randint(1, 3),
+            rand.choice(work_types),
+            rand.choice(['True', 'True', 'True', 'False']),
+            rand.choice(employees)
+        ))
+    return '\n'.join(lines) + '\n'
+
+
+def generate_searches():
+    """ Every schedule which can be searched for
+    """
+    for work_day in xrange(1, 8):
+        for work_shift in xrange(1, 4):
+            for work_type in sorted(WorkTypes().map.values()):
+                yield Schedule(work_day=work_day, work_shift=work_shift, work_type=work_type, worked=1, employee_id=0)
+
+
+class LsiSearchDifferentialTest(unittest.TestCase):
+    """ Check the search engines against the reference LsiSearch.perform_search
+    """
+
+    def exact_score(self, reference, search_schedule, index):
+        """ The float64 score of a historical row (by result index) for a search
+        """
+        search_weights = reference.generate_row_weights(reference.k_limit, reference.eigen_space, [
+            search_schedule.work_day,
+            search_schedule.work_shift,
+            search_schedule.work_type,
+            1, 1, 0, 0, 0, 0
+        ])
+        row_weights = reference.weights[index - 2]
+        return reference.cosine_similarity(search_weights, row_weights)
+
+    def assertResultsAgree(self, reference, search_schedule, expected, actual, tolerance, message):
+        """ Check two result lists hold the same rows with the same scores (within tolerance)
+
+        Rows may only differ where their score is within tolerance of the lowest expected score
+        """
+        for result in actual:
+            self.assertAlmostEqual(result.score, self.exact_score(reference, search_schedule, result.index),
+                                   delta=tolerance, msg=message)
+        if not expected:
+            self.assertEqual(actual, [], message)
+            return
+        boundary = expected[-1].score
+        expected_indexes = set(result.index for result in expected)
+        actual_indexes = set(result.index for result in actual)
+        for index in expected_indexes ^ actual_indexes:
+            self.assertAlmostEqual(self.exact_score(reference, search_schedule, index), boundary,
+                                   delta=tolerance, msg='%s, row %s' % (message, index))
+
+    def test_engines_match_reference(self):
+        for seed in HISTORY_SEEDS:
+            history = generate_history(seed)
+            reference = LsiSearch()
+            engines = {}
+            for engine_name in SEARCH_ENGINES:
+                engines[engine_name] = SEARCH_ENGINES[engine_name][0]()
+            for search_schedule in generate_searches():
+                expected = reference.find_in_csv(StringIO(history), search_schedule, RESULT_COUNT)
+                for engine_name in sorted(engines):
+                    actual = engines[engine_name].find_in_csv(StringIO(history), search_schedule, RESULT_COUNT)
+                    self.assertResultsAgree(reference, search_schedule, expected, actual,
+                                            SEARCH_ENGINES[engine_name][1],
+                                            'engine %s, seed %s, %s' % (engine_name, seed, search_schedule))
+
+    def test_approximate_engines_agree_with_reference(self):
+        for engine_name in sorted(APPROXIMATE_SEARCH_ENGINES):
+            engine_factory, tolerance, min_agreement = APPROXIMATE_SEARCH_ENGINES[engine_name]
+            agreement = []
+            for seed in HISTORY_SEEDS:
+                history = generate_history(seed)
+                reference = LsiSearch()
+                engine = engine_factory()
+                for search_schedule in generate_searches():
+                    expected = reference.find_in_csv(StringIO(history), search_schedule, RESULT_COUNT)
+                    actual = engine.find_in_csv(StringIO(history), search_schedule, RESULT_COUNT)
+                    for result in actual:
+                        self.assertAlmostEqual(result.score,
+                                               self.exact_score(reference, search_schedule, result.index),
+                                               delta=tolerance)
+                    if expected:
+                        expected_indexes = set(result.index for result in expected)
+                        actual_indexes = set(result.index for result in actual)
+                        agreement.append(len(expected_indexes & actual_indexes) / float(len(expected_indexes)))
+            self.assertGreaterEqual(sum(agreement) / len(agreement), min_agreement, engine_name)
+
+    def test_ranking_agreement(self):
+        history = generate_history(0)
+        self.assertEqual(LsiSearch().ranking_agreement(StringIO(history), generate_searches(), RESULT_COUNT), 1.0)
+        agreement = LsiSearch('int8').ranking_agreement(StringIO(history), generate_searches(), RESULT_COUNT)
+        self.assertGreater(agreement, 0.9)
+        self.assertLessEqual(agreement, 1.0)
+
+    def test_cached_model_matches_fresh(self):
+        history = generate_history(0)
+        cached = LsiSearch()
+        for search_schedule in list(generate_searches())[::7]:
+            expected = LsiSearch().find_in_csv(StringIO(history), search_schedule, RESULT_COUNT)
+            actual = cached.find_in_csv(StringIO(history), search_schedule, RESULT_COUNT)
+            self.assertEqual(actual, expected)
+
+    def test_int8_weights_round_trip(self):
+        reference = LsiSearch()
+        reference.find_in_csv(StringIO(generate_history(0)), next(generate_searches()), RESULT_COUNT)
+        quantized = LsiSearch('int8')
+        weights, scales, norms = quantized.quantize_weights(reference.weights)
+        for row, weight_vector in enumerate(reference.weights):
+            for index, weight in enumerate(weight_vector):
+                # rounding error is at most half a quantization step
+                self.assertAlmostEqual(weights[row][index] * scales[row], weight, delta=(scales[row] * 0.5) + 1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
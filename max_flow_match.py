@@ -5,6 +5,8 @@ from __future__ import print_function
 
 import argparse
 import csv
+import json
+import multiprocessing
 import sys
 
 from collections import namedtuple
@@ -13,7 +15,8 @@ from work_types import WorkTypes
 from lsi_search import Schedule, LsiSearch
 
 OpenShift = namedtuple('OpenShift', 'work_day work_shift work_type')
-_DEBUG_PRINT = True
+Assignment = namedtuple('Assignment', 'shift employee hours score')
+_DEBUG_PRINT = False
 
 
 def _log_print(print_string=None, end=None):
@@ -26,6 +29,15 @@ def _log_print(print_string=None, end=None):
         print()
 
 
+def set_debug_print(debug):
+    """ Turn debug printing on or off for this process (also the process pool initializer)
+
+    :debug:     print the graph and each augmenting path while solving
+    """
+    global _DEBUG_PRINT
+    _DEBUG_PRINT = debug
+
+
 def _debug_print(print_string=None, end=None):
     if not _DEBUG_PRINT:
         return
@@ -38,6 +50,29 @@ def _debug_print(print_string=None, end=None):
         print()
 
 
+def _solve_component(schedule_graph):
+    """ Solve max-flow for one component graph (process pool entry point)
+
+    :schedule_graph:    the component graph to solve
+    :returns:           the solved component graph
+    """
+    schedule_graph.max_flow(schedule_graph.ID_SOURCE, schedule_graph.ID_SINK)
+    return schedule_graph
+
+
+def _solve_horizon_component(horizon_job):
+    """ Solve one component of a multi-week horizon (process pool entry point)
+
+    :horizon_job:   tuple of (window_weeks, horizon_hours, week_candidate_list)
+    :returns:       the solved component graph, its capacity node to employee map
+    """
+    window_weeks, horizon_hours, week_candidate_list = horizon_job
+    matcher = MaxFlowMatch(1, window_weeks, horizon_hours)
+    matcher.initialize_graph()
+    matcher.solve_horizon(week_candidate_list, window_weeks)
+    return matcher.schedule_graph, matcher.employee_keys
+
+
 class Node():
     """ Directed Graph Node
     """
@@ -135,6 +170,20 @@ class Graph():
         """
         self.add_edge(source_node, self.ID_SINK, capacity)
 
+    def close_edge(self, source_node, sink_node):
+        """ Remove an edge (in both directions) from the residual graph, keeping its flow
+
+        Searches will no longer walk the edge, so the flow across it becomes fixed
+
+        :source_node:   where the edge begins
+        :sink_node:     where the edge ends
+        """
+        if source_node not in self.nodes or sink_node not in self.nodes[source_node].edges:
+            _log_print("ERROR: Graph.close_edge -- invalid edge from (%s) to (%s)" % (source_node, sink_node))
+            return
+        self.nodes[source_node].residuals.pop(sink_node, None)
+        self.nodes[sink_node].residuals.pop(source_node, None)
+
     def breadth_first_search(self, source_node, target_node):
         """ Perform a breadth first search, obviously
 
@@ -156,64 +205,73 @@ class Graph():
             _log_print("ERROR: Graph.depth_first_search -- invalid target (%s)" % target_node)
             return
 
-        # starting max capacity (should be restricted as graph is traveresed)
-        capacity = sys.maxint
         # list of found nodes (which we should attempt to visit latter)
         node_list = []
         node_list.append(source_node)
-        # list of capacities for the found nodes
-        capacity_list = []
-        capacity_list.append(capacity)
-        # used to get the search path
+        # list of the nodes each found node was reached from
         parent_list = []
+        parent_list.append(None)
+        # used to get the search path (node => node it was visited from)
+        parents = {}
         # list of already visited nodes
         visited = {}
 
         target_found = False
         while len(node_list):
-            # TODO: consider combining these 3 lists into one (list of named tuples)
             current_node = node_list.pop()
-            current_capacity = capacity_list.pop()
-            capacity = min(capacity, current_capacity)
+            current_parent = parent_list.pop()
 
             # we have not previously seen this node
             if current_node not in visited:
                 visited[current_node] = 1
+                parents[current_node] = current_parent
                 # get the outbound edges from the current node
-                # edges = self.nodes[current_node].edges
                 residuals = self.nodes[current_node].residuals
-                for i, edge in enumerate(residuals):
+                edges = self.nodes[current_node].edges
+                forward_nodes = []
+                reverse_nodes = []
+                for edge in residuals:
+                    # check that the edge has capacity
+                    if residuals[edge] <= 0:
+                        continue
                     if edge == target_node:
-                        # add final items to the search path
-                        parent_list.append(current_node)
-                        parent_list.append(target_node)
+                        parents[target_node] = current_node
                         # prepare to exit the outer while loop
                         node_list = []
                         # prepare to enter post processing step
                         target_found = True
                         # exit the inner for loop
                         break
-                    # check that the edge has capacity
-                    if residuals[edge] > 0:
-                        # add to the list the while loop is pulling from
-                        node_list.append(edge)
-                        capacity_list.append(residuals[edge])
-                        parent_list.append(current_node)
+                    if edge in edges:
+                        forward_nodes.append(edge)
+                    else:
+                        reverse_nodes.append(edge)
+                if target_found:
+                    break
+                # add to the list the while loop is pulling from (forward edges last, so they are tried first
+                #  and reverse edges are only followed to re-route flow when no shorter path is left)
+                for edge in reverse_nodes + forward_nodes:
+                    node_list.append(edge)
+                    parent_list.append(current_node)
 
         search_path = []
+        capacity = 0
         if target_found:
-            node_last = 0
-            for i in range((len(parent_list) - 1), -1, -1):
-                if parent_list[i] != node_last:
-                    search_path.append(parent_list[i])
-                node_last = parent_list[i]
+            node = target_node
+            while node is not None:
+                search_path.append(node)
+                node = parents[node]
             search_path.reverse()
 
-            for sp in search_path:
-                _debug_print("%s ==> " % sp, end="")
-            _debug_print(" (%s)" % capacity)
-        else:
-            capacity = 0
+            # the path capacity is restricted by its narrowest edge
+            capacity = sys.maxint
+            for i in range(len(search_path) - 1):
+                capacity = min(capacity, self.nodes[search_path[i]].residuals[search_path[i + 1]])
+
+            if _DEBUG_PRINT:
+                for sp in search_path:
+                    _debug_print("%s ==> " % sp, end="")
+                _debug_print(" (%s)" % capacity)
 
         return capacity, search_path
 
@@ -229,6 +287,7 @@ class Graph():
 
             if search_path_flow <= 0 or len(search_path) == 0 or search_path_flow == sys.maxint:
                 break
+            total_capacity += search_path_flow
 
             for i, node in enumerate(search_path):
                 if i == (len(search_path) - 1):
@@ -236,15 +295,25 @@ class Graph():
                 current_node = self.nodes[node]
                 next_node = search_path[i + 1]
 
-                current_node.flows[next_node] += search_path_flow
-                current_node.residuals[next_node] = current_node.edges[next_node] - current_node.flows[next_node]
-
-                _debug_print("%s ~~%s-%s=%s~~> %s|" %
-                             (node,
-                              current_node.edges[next_node],
-                              current_node.flows[next_node],
-                              current_node.residuals[next_node],
-                              next_node), end="")
+                if next_node in current_node.edges:
+                    # push flow forward along the edge
+                    edge_node, edge_end = current_node, next_node
+                    edge_node.flows[edge_end] += search_path_flow
+                else:
+                    # walking an edge backwards cancels flow previously pushed along it
+                    edge_node, edge_end = self.nodes[next_node], node
+                    edge_node.flows[edge_end] -= search_path_flow
+                edge_node.residuals[edge_end] = edge_node.edges[edge_end] - edge_node.flows[edge_end]
+                # the reverse residual lets later searches undo this flow
+                self.nodes[edge_end].residuals[edge_node.node_id] = edge_node.flows[edge_end]
+
+                if _DEBUG_PRINT:
+                    _debug_print("%s ~~%s-%s=%s~~> %s|" %
+                                 (edge_node.node_id,
+                                  edge_node.edges[edge_end],
+                                  edge_node.flows[edge_end],
+                                  edge_node.residuals[edge_end],
+                                  edge_end), end="")
             _debug_print()
             _debug_print()
         return total_capacity, flow_graph
@@ -254,20 +323,152 @@ class Graph():
         """
         return self.edmonds_karp(source_node, target_node)
 
+    def merge(self, other_graph):
+        """ Merge the nodes (and their edges, flows and residuals) of another graph into this one
+
+        The other graph is expected to share no nodes with this graph other than the source and sink
+
+        :other_graph:   the graph to merge into this one
+        """
+        for node_id in other_graph.nodes:
+            other_node = other_graph.nodes[node_id]
+            if node_id not in self.nodes:
+                self.nodes[node_id] = other_node
+                continue
+            node = self.nodes[node_id]
+            node.edges.update(other_node.edges)
+            node.flows.update(other_node.flows)
+            node.residuals.update(other_node.residuals)
+
     def dump(self):
-        """ Print the graph
+        """ Print the graph (only when debug printing is on)
         """
+        if not _DEBUG_PRINT:
+            return
         for node in self.nodes:
             _debug_print("%s: " % node, end="")
             edges = self.nodes[node].edges
             flows = self.nodes[node].flows
             residuals = self.nodes[node].residuals
             for edge in edges:
-                _debug_print("%s (%s - %s = %s), " % (edge, edges[edge], flows[edge], residuals[edge]), end="")
+                _debug_print("%s (%s - %s = %s), " % (edge, edges[edge], flows[edge], residuals.get(edge, 0)), end="")
             _debug_print()
         _debug_print()
 
 
+class UnionFind():
+    """ Disjoint set forest (with path compression and union by size)
+    """
+
+    def __init__(self):
+        self.parents = {}
+        self.sizes = {}
+
+    def add(self, item):
+        """ Add an item as its own set
+
+        :item:  the item to add
+        """
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+
+    def find(self, item):
+        """ Find the representative of the set containing an item
+
+        :item:      the item to look up
+        :returns:   the set representative
+        """
+        self.add(item)
+        root = item
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[item] != root:
+            self.parents[item], item = root, self.parents[item]
+        return root
+
+    def union(self, item_a, item_b):
+        """ Join the sets containing two items
+
+        :item_a:    an item in the first set
+        :item_b:    an item in the second set
+        """
+        root_a = self.find(item_a)
+        root_b = self.find(item_b)
+        if root_a == root_b:
+            return
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] += self.sizes[root_b]
+
+
+class ScheduleResult():
+    """ Shift assignments read (lazily) from a solved schedule graph
+    """
+    CSV_COLUMNS = ('shift', 'employee', 'hours', 'score')
+
+    def __init__(self, schedule_graph, shift_keys, employee_keys=None, candidate_scores=None):
+        """ Initialize the result
+
+        :schedule_graph:    the solved graph
+        :shift_keys:        shift node ids in roster order (repeated when a shift needs more than one employee)
+        :employee_keys:     maps capacity node ids back to employees
+        :candidate_scores:  shift node id => employee => search score
+        """
+        self.schedule_graph = schedule_graph
+        self.shift_keys = shift_keys
+        self.employee_keys = employee_keys or {}
+        self.candidate_scores = candidate_scores or {}
+
+    def assignments(self):
+        """ Generate one Assignment per shift in roster order
+        Unfilled shifts have no employee, zero hours and no score
+
+        :returns:   generator of Assignment
+        """
+        # flows already handed out to earlier copies of a repeated shift
+        assigned = {}
+        for shift_key in self.shift_keys:
+            flows = self.schedule_graph.nodes[shift_key].flows
+            shift_assigned = assigned.setdefault(shift_key, {})
+            assignment = Assignment(shift=shift_key, employee=None, hours=0, score=None)
+            for flow in flows:
+                if flows[flow] > 0 and flow not in shift_assigned:
+                    shift_assigned[flow] = True
+                    employee = self.employee_keys.get(flow, flow)
+                    score = self.candidate_scores.get(shift_key, {}).get(employee)
+                    assignment = Assignment(shift=shift_key, employee=employee, hours=flows[flow], score=score)
+                    break
+            yield assignment
+
+    def unfilled(self):
+        """ List the shifts no employee could be found for
+
+        :returns:   list of shift node ids (in roster order)
+        """
+        return [assignment.shift for assignment in self.assignments() if assignment.employee is None]
+
+    def write_csv(self, output_stream):
+        """ Write the assignments as CSV
+
+        :output_stream: stream to write to
+        """
+        writer = csv.writer(output_stream)
+        writer.writerow(self.CSV_COLUMNS)
+        for assignment in self.assignments():
+            writer.writerow(['' if value is None else value for value in assignment])
+
+    def write_json_lines(self, output_stream):
+        """ Write the assignments as JSON lines (one object per assignment)
+
+        :output_stream: stream to write to
+        """
+        for assignment in self.assignments():
+            output_stream.write(json.dumps(assignment._asdict()))
+            output_stream.write('\n')
+
+
 class MaxFlowMatch():
     """ Match workers to shifts using a graph-based max-flow technique
     """
@@ -277,9 +478,36 @@ class MaxFlowMatch():
         'work_type': 'work_type'
     }
     WORK_TYPE_MAP = WorkTypes().map
-
-    def __init__(self):
+    # components with at least this many shift and employee nodes are solved on the process pool
+    PARALLEL_MIN_NODES = 256
+    DAYS_WEEK = 7
+    HOURS_SHIFT = 8
+    HOURS_WEEK = 40
+    OUTPUT_FORMATS = ('csv', 'jsonl')
+
+    def __init__(self, workers=None, window_weeks=None, horizon_hours=None, debug=False):
+        """ Initialize the matcher
+
+        :workers:       number of processes used to solve large components
+                        (defaults to the number of CPUs)
+        :window_weeks:  number of weeks in each rolling window of a multi-week horizon
+                        (defaults to solving all shifts as a single week)
+        :horizon_hours: most hours an employee may work over the whole horizon
+                        (defaults to HOURS_WEEK for every week in the horizon)
+        :debug:         print the graph and each augmenting path while solving
+                        (in this process and in the process pool workers)
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers < 1:
+            raise ValueError("MaxFlowMatch -- invalid number of workers (%s)" % workers)
         self.schedule_graph = None
+        self.workers = workers
+        self.window_weeks = window_weeks
+        self.horizon_hours = horizon_hours
+        self.debug = debug
+        # maps capacity node ids back to the employee they belong to
+        self.employee_keys = {}
 
     def read_shift_csv(self, open_shift_stream):
         """ Read a CSV file and return a list of lists
@@ -312,69 +540,294 @@ class MaxFlowMatch():
         if self.schedule_graph is None:
             self.schedule_graph = Graph()
 
-    def add_to_graph(self, shift_key, shift_candidates):
+    def add_to_graph(self, shift_key, shift_candidates, schedule_graph=None):
         """ Add node (and associated edges) to graph
 
         :shift_key:         the shift node to add
         :shift_candidates:  list of OpenShift candidates to add/update nodes for
+        :schedule_graph:    the graph to add to (defaults to the schedule graph)
         """
-        HOURS_SHIFT = 8
-        HOURS_WEEK = 40
-        self.schedule_graph.add_node(shift_key)
-        self.schedule_graph.add_leading_edge(shift_key, HOURS_SHIFT)
+        if schedule_graph is None:
+            schedule_graph = self.schedule_graph
+        schedule_graph.add_node(shift_key)
+        schedule_graph.add_leading_edge(shift_key, self.HOURS_SHIFT)
         for shift_candidate in shift_candidates:
             candidate_key = '{}'.format(shift_candidate.employee)
-            self.schedule_graph.add_node(candidate_key)
-            self.schedule_graph.add_edge(shift_key, candidate_key, HOURS_SHIFT)
-            self.schedule_graph.add_trailing_edge(candidate_key, HOURS_WEEK)
+            schedule_graph.add_node(candidate_key)
+            # edges are only added once, a repeated shift or employee keeps the same capacity
+            if candidate_key not in schedule_graph.nodes[shift_key].edges:
+                schedule_graph.add_edge(shift_key, candidate_key, self.HOURS_SHIFT)
+            if schedule_graph.ID_SINK not in schedule_graph.nodes[candidate_key].edges:
+                schedule_graph.add_trailing_edge(candidate_key, self.HOURS_WEEK)
+
+    def get_week(self, work_day):
+        """ Get the week (of the horizon) a work day belongs to
+
+        :work_day:  the work day (1 is the first day of the first week)
+        :returns:   the zero based week number
+        """
+        return max(work_day - 1, 0) // self.DAYS_WEEK
 
-    def find_and_print(self, hist_data_stream, open_shift_stream):
+    def get_week_day(self, work_day):
+        """ Get the day of the week for a work day in the horizon
+
+        :work_day:  the work day (1 is the first day of the first week)
+        :returns:   the day of the week (1-7)
+        """
+        if work_day < 1:
+            return work_day
+        return ((work_day - 1) % self.DAYS_WEEK) + 1
+
+    def add_to_horizon_graph(self, shift_key, week, shift_candidates, horizon_capacity):
+        """ Add node (and associated edges) to the time-expanded graph
+
+        Each employee gets one capacity node per week (capped at HOURS_WEEK), which all feed
+        one horizon node per employee (capped at the horizon capacity)
+
+        :shift_key:         the shift node to add
+        :week:              the week the shift belongs to
+        :shift_candidates:  list of OpenShift candidates to add/update nodes for
+        :horizon_capacity:  most hours an employee may work over the whole horizon
+        """
+        self.schedule_graph.add_node(shift_key)
+        self.schedule_graph.add_leading_edge(shift_key, self.HOURS_SHIFT)
+        for shift_candidate in shift_candidates:
+            employee_key = '{}'.format(shift_candidate.employee)
+            candidate_key = '{}@w{}'.format(employee_key, week)
+            self.employee_keys[candidate_key] = employee_key
+            self.schedule_graph.add_node(candidate_key)
+            self.schedule_graph.add_node(employee_key)
+            # edges are only added once, a repeated shift or employee keeps the same capacity
+            if candidate_key not in self.schedule_graph.nodes[shift_key].edges:
+                self.schedule_graph.add_edge(shift_key, candidate_key, self.HOURS_SHIFT)
+            if employee_key not in self.schedule_graph.nodes[candidate_key].edges:
+                self.schedule_graph.add_edge(candidate_key, employee_key, self.HOURS_WEEK)
+            if self.schedule_graph.ID_SINK not in self.schedule_graph.nodes[employee_key].edges:
+                self.schedule_graph.add_trailing_edge(employee_key, horizon_capacity)
+
+    def solve_horizon(self, week_candidate_list, window_weeks):
+        """ Solve max-flow over a multi-week horizon using rolling windows
+
+        The graph is kept between windows, so each solve starts from the previous window's flow
+        and only has to place the newly added week (shifts in the window may still be moved between
+        employees to make room). Once a week leaves the window, its shifts and capacity nodes are
+        removed from the residual graph, so its assignments (and the horizon hours they use) are final.
+
+        :week_candidate_list:   list of (week, shift_key, shift_candidates) tuples
+        :window_weeks:          number of weeks in each window
+        """
+        week_shifts = {}
+        for week, shift_key, shift_candidates in week_candidate_list:
+            if week not in week_shifts:
+                week_shifts[week] = []
+            week_shifts[week].append((shift_key, shift_candidates))
+        weeks = sorted(week_shifts)
+        window_weeks = max(window_weeks, 1)
+        horizon_capacity = self.horizon_hours
+        if horizon_capacity is None:
+            horizon_capacity = self.HOURS_WEEK * len(weeks)
+
+        weeks_loaded = 0
+        for window_start, week in enumerate(weeks):
+            window_end = min(window_start + window_weeks, len(weeks))
+            while weeks_loaded < window_end:
+                for shift_key, shift_candidates in week_shifts[weeks[weeks_loaded]]:
+                    self.add_to_horizon_graph(shift_key, weeks[weeks_loaded], shift_candidates, horizon_capacity)
+                weeks_loaded += 1
+
+            _debug_print("window: weeks %s to %s" % (week, weeks[window_end - 1]))
+            self.schedule_graph.max_flow(self.schedule_graph.ID_SOURCE, self.schedule_graph.ID_SINK)
+
+            for shift_key, shift_candidates in week_shifts[week]:
+                self.schedule_graph.close_edge(self.schedule_graph.ID_SOURCE, shift_key)
+                for shift_candidate in shift_candidates:
+                    employee_key = '{}'.format(shift_candidate.employee)
+                    self.schedule_graph.close_edge('{}@w{}'.format(employee_key, week), employee_key)
+
+    def find_components(self, shift_candidate_list):
+        """ Split the shifts into independent parts of the shift-employee graph
+
+        Shifts which share no candidates (directly or through other shifts) cannot compete
+        for the same hours, so each component can be solved on its own
+
+        :shift_candidate_list:  list of tuples ending with the shift_key and shift_candidates
+                                (e.g. (shift_key, shift_candidates) or (week, shift_key, shift_candidates))
+        :returns:               a list of components, each a list of those tuples
+        """
+        components = UnionFind()
+        for shift_item in shift_candidate_list:
+            shift_key, shift_candidates = shift_item[-2:]
+            components.add(('shift', shift_key))
+            for shift_candidate in shift_candidates:
+                components.union(('shift', shift_key), ('employee', '{}'.format(shift_candidate.employee)))
+
+        component_index = {}
+        component_list = []
+        for shift_item in shift_candidate_list:
+            root = components.find(('shift', shift_item[-2]))
+            if root not in component_index:
+                component_index[root] = len(component_list)
+                component_list.append([])
+            component_list[component_index[root]].append(shift_item)
+        return component_list
+
+    def map_components(self, solve_function, component_jobs, component_sizes):
+        """ Run a solve function over component jobs
+        Jobs with at least PARALLEL_MIN_NODES nodes are run on a process pool, the rest in this process
+
+        :solve_function:    module level function taking one job
+        :component_jobs:    list of jobs
+        :component_sizes:   node count for each job
+        :returns:           the results, in job order
+        """
+        results = [None] * len(component_jobs)
+        large_jobs = [i for i, size in enumerate(component_sizes) if size >= self.PARALLEL_MIN_NODES]
+        if len(large_jobs) > 1 and self.workers > 1:
+            pool = multiprocessing.Pool(self.workers, set_debug_print, (self.debug,))
+            try:
+                large_results = pool.map(solve_function, [component_jobs[i] for i in large_jobs])
+            finally:
+                pool.close()
+                pool.join()
+            for i, result in zip(large_jobs, large_results):
+                results[i] = result
+        for i, component_job in enumerate(component_jobs):
+            if results[i] is None:
+                results[i] = solve_function(component_job)
+        return results
+
+    def solve_components(self, component_list):
+        """ Solve max-flow for each component and merge the results into the schedule graph
+
+        Small components are solved in this process, large ones on a process pool
+
+        :component_list:    list of components from find_components
+        """
+        component_graphs = []
+        component_sizes = []
+        for component in component_list:
+            component_graph = Graph()
+            for shift_key, shift_candidates in component:
+                self.add_to_graph(shift_key, shift_candidates, component_graph)
+            component_graphs.append(component_graph)
+            # do not count the source and sink nodes
+            component_sizes.append(len(component_graph.nodes) - 2)
+
+        for component_graph in self.map_components(_solve_component, component_graphs, component_sizes):
+            self.schedule_graph.merge(component_graph)
+
+    def solve_horizon_components(self, component_list):
+        """ Solve each component of a multi-week horizon in rolling windows
+        and merge the results into the schedule graph
+
+        :component_list:    list of components from find_components (of (week, shift_key, shift_candidates))
+        """
+        horizon_jobs = []
+        component_sizes = []
+        for component in component_list:
+            horizon_jobs.append((self.window_weeks, self.horizon_hours, component))
+            capacity_nodes = set()
+            for week, shift_key, shift_candidates in component:
+                for shift_candidate in shift_candidates:
+                    capacity_nodes.add((week, '{}'.format(shift_candidate.employee)))
+            component_sizes.append(len(component) + len(capacity_nodes))
+
+        for component_graph, employee_keys in self.map_components(_solve_horizon_component, horizon_jobs,
+                                                                  component_sizes):
+            self.schedule_graph.merge(component_graph)
+            self.employee_keys.update(employee_keys)
+
+    def find(self, hist_data_stream, open_shift_stream):
         """ Find the best candidates for a set of open shifts
             Given historical data and desired shifts to fill
 
         :hist_data_stream:  file stream containing the historical data
         :open_shift_stream: file stream containing the open shift data
+        :returns:           a ScheduleResult
         """
-        lsi = LsiSearch()
-        self.initialize_graph()
-        shift_list = self.read_shift_csv(open_shift_stream)
-        shift_list_keys = []
-        # schedule_size = len(shift_list)
-        for shift in shift_list:
-            # TODO: pull out into a method?
-            shift_key = '{}-{}-{}'.format(shift.work_day, shift.work_shift, shift.work_type)
-            shift_list_keys.append(shift_key)
-
-            search_schedule = Schedule(
-                work_day=shift.work_day,
-                work_shift=shift.work_shift,
-                work_type=shift.work_type,
-                worked=1,
-                employee_id=0
-            )
-            # TODO: go fix lsi, there are duplicate employee ids coming through
-            shift_candidates = lsi.find_in_csv(hist_data_stream, search_schedule, len(shift_list))
-            self.add_to_graph(shift_key, shift_candidates)
+        # only for this solve, so debug printing turned on elsewhere in the process is left as it was
+        debug_print = _DEBUG_PRINT
+        set_debug_print(self.debug)
+        try:
+            lsi = LsiSearch()
+            # each result keeps its own graph, so finding again does not change an earlier result
+            self.schedule_graph = Graph()
+            self.employee_keys = {}
+            shift_list = self.read_shift_csv(open_shift_stream)
+            shift_list_keys = []
+            shift_candidate_list = []
+            week_candidate_list = []
+            candidate_scores = {}
+            # schedule_size = len(shift_list)
+            for shift in shift_list:
+                # TODO: pull out into a method?
+                shift_key = '{}-{}-{}'.format(shift.work_day, shift.work_shift, shift.work_type)
+                shift_list_keys.append(shift_key)
+
+                search_work_day = shift.work_day
+                if self.window_weeks:
+                    # historical data only covers one week
+                    search_work_day = self.get_week_day(shift.work_day)
+                search_schedule = Schedule(
+                    work_day=search_work_day,
+                    work_shift=shift.work_shift,
+                    work_type=shift.work_type,
+                    worked=1,
+                    employee_id=0
+                )
+                # TODO: go fix lsi, there are duplicate employee ids coming through
+                shift_candidates = lsi.find_in_csv(hist_data_stream, search_schedule, len(shift_list))
+                shift_candidate_list.append((shift_key, shift_candidates))
+                shift_scores = candidate_scores.setdefault(shift_key, {})
+                for shift_candidate in shift_candidates:
+                    employee = '{}'.format(shift_candidate.employee)
+                    shift_scores[employee] = max(shift_scores.get(employee, shift_candidate.score),
+                                                 shift_candidate.score)
+                week_candidate_list.append((self.get_week(shift.work_day), shift_key, shift_candidates))
+
+            if self.window_weeks:
+                component_list = self.find_components(week_candidate_list)
+                _debug_print("components: %s" % len(component_list))
+                _debug_print()
+                self.solve_horizon_components(component_list)
+            else:
+                component_list = self.find_components(shift_candidate_list)
+                _debug_print("components: %s" % len(component_list))
+                _debug_print()
+                self.solve_components(component_list)
+            self.schedule_graph.dump()
+
+            return ScheduleResult(self.schedule_graph, shift_list_keys, self.employee_keys, candidate_scores)
+        finally:
+            set_debug_print(debug_print)
+
+    def find_and_write(self, hist_data_stream, open_shift_stream, output_stream, output_format='csv'):
+        """ Find the best candidates for a set of open shifts and write the assignments
 
-        _debug_print()
-        self.schedule_graph.dump()
-        # self.schedule_graph.depth_first_search(self.schedule_graph.ID_SOURCE, self.schedule_graph.ID_SINK)
-        # self.schedule_graph.depth_first_search(self.schedule_graph.ID_SOURCE, 'B0023')
-        # _debug_print()
-        self.schedule_graph.max_flow(self.schedule_graph.ID_SOURCE, self.schedule_graph.ID_SINK)
-        self.schedule_graph.dump()
-
-        for shift in shift_list_keys:
-            flows = self.schedule_graph.nodes[shift].flows
-            found_employee = False
-            for flow in flows:
-                if flows[flow] > 0:
-                    _log_print("shift: %s, employee: %s, hours: %s" % (shift, flow, flows[flow]))
-                    found_employee = True
-                    flows[flow] = 0
-                    break
-            if not found_employee:
-                _log_print("shift: %s, employee: %s, hours: %s" % (shift, '--?--', flows[flow]))
+        :hist_data_stream:  file stream containing the historical data
+        :open_shift_stream: file stream containing the open shift data
+        :output_stream:     stream to write the assignments to
+        :output_format:     one of OUTPUT_FORMATS
+        """
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError("MaxFlowMatch.find_and_write -- invalid output format (%s)" % output_format)
+        result = self.find(hist_data_stream, open_shift_stream)
+        if output_format == 'jsonl':
+            result.write_json_lines(output_stream)
+        else:
+            result.write_csv(output_stream)
+
+    def find_and_print(self, hist_data_stream, open_shift_stream):
+        """ Find the best candidates for a set of open shifts and print the assignments
+
+        :hist_data_stream:  file stream containing the historical data
+        :open_shift_stream: file stream containing the open shift data
+        """
+        for assignment in self.find(hist_data_stream, open_shift_stream).assignments():
+            employee = assignment.employee
+            if employee is None:
+                employee = '--?--'
+            _log_print("shift: %s, employee: %s, hours: %s" % (assignment.shift, employee, assignment.hours))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Find the best matches for open shifts given historical data')
@@ -386,5 +839,32 @@ if __name__ == "__main__":
                         type=argparse.FileType('r'),
                         default=sys.stdin,
                         help="CSV file with historical data (or stdin)")
+    parser.add_argument("--workers",
+                        type=int,
+                        default=None,
+                        help="Processes used to solve large graph components (default: CPU count)")
+    parser.add_argument("--window-weeks",
+                        type=int,
+                        default=None,
+                        help="Solve a multi-week horizon in rolling windows of this many weeks")
+    parser.add_argument("--horizon-hours",
+                        type=int,
+                        default=None,
+                        help="Most hours an employee may work over the horizon (default: 40 per week)")
+    parser.add_argument("--output",
+                        type=argparse.FileType('w'),
+                        default=None,
+                        help="Write the assignments to this file (instead of printing them)")
+    parser.add_argument("--format",
+                        choices=MaxFlowMatch.OUTPUT_FORMATS,
+                        default='csv',
+                        help="Format for the assignments written to --output")
+    parser.add_argument("--debug",
+                        action='store_true',
+                        help="Print the graph and each augmenting path while solving")
     args = parser.parse_args()
-    MaxFlowMatch().find_and_print(args.historical_data_file, args.open_shift_file)
+    matcher = MaxFlowMatch(args.workers, args.window_weeks, args.horizon_hours, args.debug)
+    if args.output:
+        matcher.find_and_write(args.historical_data_file, args.open_shift_file, args.output, args.format)
+    else:
+        matcher.find_and_print(args.historical_data_file, args.open_shift_file)
@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+import unittest
+
+from collections import namedtuple
+from StringIO import StringIO
+
+import max_flow_match
+from max_flow_match import Assignment, Graph, MaxFlowMatch, ScheduleResult
+
+Candidate = namedtuple('Candidate', 'employee')
+
+# every flow engine must match the reference max-flow value on these rosters
+ROSTER_SEEDS = range(20)
+# the sample data used by `make test`
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+HIST_DATA_FILE = os.path.join(DATA_DIR, '_historical_data.csv')
+OPEN_SHIFT_FILE = os.path.join(DATA_DIR, '_open_shifts.csv')
+
+
+def generate_roster(seed, facility_count=4, shift_count=40, employee_count=12, candidate_max=6):
+    """ Generate a random roster of open shifts and their candidates
+
+    Each facility has its own pool of employees, so the roster splits into several components.
+    Some shifts are repeated (the same shift needing more than one employee).
+
+    :seed:              seed for the random generator
+    :facility_count:    number of independent employee pools
+    :shift_count:       number of open shifts per facility
+    :employee_count:    number of employees per facility
+    :candidate_max:     the most candidates a shift can have
+    :returns:           list of (shift_key, shift_candidates) tuples
+    """
+    rand = random.Random(seed)
+    shift_candidate_list = []
+    for facility in xrange(facility_count):
+        employees = ['F{}E{:03d}'.format(facility, i) for i in xrange(employee_count)]
+        for i in xrange(shift_count):
+            shift_key = '{}-{}-{}'.format(rand.randint(1, 7), rand.randint(1, 3), facility)
+            candidates = rand.sample(employees, rand.randint(0, candidate_max))
+            shift_candidate_list.append((shift_key, [Candidate(employee) for employee in candidates]))
+    return shift_candidate_list
+
+
+def generate_horizon_roster(seed, week_count=4, facility_count=1, shift_count=12, employee_count=4,
+                            candidate_max=3):
+    """ Generate a random multi-week roster of open shifts and their candidates
+
+    :seed:              seed for the random generator
+    :week_count:        number of weeks in the horizon
+    :facility_count:    number of independent employee pools
+    :shift_count:       number of open shifts per facility per week
+    :employee_count:    number of employees per facility
+    :candidate_max:     the most candidates a shift can have
+    :returns:           list of (week, shift_key, shift_candidates) tuples
+    """
+    rand = random.Random(seed)
+    week_candidate_list = []
+    for week in xrange(week_count):
+        for facility in xrange(facility_count):
+            employees = ['F{}E{:03d}'.format(facility, i) for i in xrange(employee_count)]
+            for i in xrange(shift_count):
+                work_day = (week * MaxFlowMatch.DAYS_WEEK) + rand.randint(1, 7)
+                shift_key = '{}-{}-{}'.format(work_day, rand.randint(1, 3), facility)
+                candidates = rand.sample(employees, rand.randint(0, candidate_max))
+                week_candidate_list.append((week, shift_key, [Candidate(employee) for employee in candidates]))
+    return week_candidate_list
+
+
+def employee_hours(matcher):
+    """ Hours worked by each employee over the whole horizon of a solved matcher
+    """
+    hours = {}
+    for candidate_key, employee_key in matcher.employee_keys.items():
+        flow = matcher.schedule_graph.nodes[candidate_key].flows.get(employee_key, 0)
+        hours[employee_key] = hours.get(employee_key, 0) + flow
+    return hours
+
+
+def generate_open_shifts(week_count=3):
+    """ Open shift CSV text with every shift of every day over several weeks
+    """
+    lines = ['work_day,work_shift,work_type']
+    for work_day in xrange(1, (week_count * MaxFlowMatch.DAYS_WEEK) + 1):
+        for work_shift in xrange(1, 4):
+            lines.append('{},{},CNA'.format(work_day, work_shift))
+    return '\n'.join(lines) + '\n'
+
+
+def debug_print_enabled(job):
+    """ Whether debug printing is on in the process running a job (process pool entry point)
+    """
+    return max_flow_match._DEBUG_PRINT
+
+
+def flow_value(schedule_graph):
+    """ The total flow leaving the graph source
+    """
+    return sum(schedule_graph.nodes[Graph.ID_SOURCE].flows.values())
+
+
+def reference_solve(shift_candidate_list):
+    """ Solve the roster as one graph with Graph.edmonds_karp
+    """
+    matcher = MaxFlowMatch()
+    matcher.initialize_graph()
+    for shift_key, shift_candidates in shift_candidate_list:
+        matcher.add_to_graph(shift_key, shift_candidates)
+    matcher.schedule_graph.edmonds_karp(Graph.ID_SOURCE, Graph.ID_SINK)
+    return matcher.schedule_graph
+
+
+def components_solve(shift_candidate_list, workers=1, parallel_min_nodes=MaxFlowMatch.PARALLEL_MIN_NODES):
+    """ Solve the roster one connected component at a time
+    """
+    matcher = MaxFlowMatch(workers)
+    matcher.PARALLEL_MIN_NODES = parallel_min_nodes
+    matcher.initialize_graph()
+    matcher.solve_components(matcher.find_components(shift_candidate_list))
+    return matcher.schedule_graph
+
+
+def horizon_solve(shift_candidate_list, workers=1, parallel_min_nodes=MaxFlowMatch.PARALLEL_MIN_NODES):
+    """ Solve the roster as a single week horizon, one connected component at a time
+    """
+    matcher = MaxFlowMatch(workers, window_weeks=1)
+    matcher.PARALLEL_MIN_NODES = parallel_min_nodes
+    matcher.initialize_graph()
+    week_candidate_list = [(0, shift_key, shift_candidates) for shift_key, shift_candidates in shift_candidate_list]
+    matcher.solve_horizon_components(matcher.find_components(week_candidate_list))
+    return matcher.schedule_graph
+
+
+def horizon_reference_solve(week_candidate_list, horizon_hours=None):
+    """ Solve the whole time-expanded graph of a multi-week roster at once with Graph.edmonds_karp
+    """
+    matcher = MaxFlowMatch(horizon_hours=horizon_hours)
+    matcher.initialize_graph()
+    horizon_capacity = horizon_hours
+    if horizon_capacity is None:
+        horizon_capacity = MaxFlowMatch.HOURS_WEEK * len(set(week for week, shift_key, shift_candidates
+                                                             in week_candidate_list))
+    for week, shift_key, shift_candidates in week_candidate_list:
+        matcher.add_to_horizon_graph(shift_key, week, shift_candidates, horizon_capacity)
+    matcher.schedule_graph.edmonds_karp(Graph.ID_SOURCE, Graph.ID_SINK)
+    return matcher
+
+
+def rolling_solve(week_candidate_list, window_weeks, horizon_hours=None, workers=1,
+                  parallel_min_nodes=MaxFlowMatch.PARALLEL_MIN_NODES):
+    """ Solve a multi-week roster in rolling windows, one connected component at a time
+    """
+    matcher = MaxFlowMatch(workers, window_weeks, horizon_hours)
+    matcher.PARALLEL_MIN_NODES = parallel_min_nodes
+    matcher.initialize_graph()
+    matcher.solve_horizon_components(matcher.find_components(week_candidate_list))
+    return matcher
+
+
+FLOW_ENGINES = {
+    'components': components_solve,
+    'components-pool': lambda shift_candidate_list: components_solve(shift_candidate_list, 2, 1),
+    'horizon': horizon_solve,
+    'horizon-pool': lambda shift_candidate_list: horizon_solve(shift_candidate_list, 2, 1),
+}
+
+# horizon hours small enough to bind on the generated multi-week rosters (None is 40 hours per week)
+HORIZON_HOURS = (None, 56)
+WEEK_COUNT = 4
+
+
+class FlowTestCase(unittest.TestCase):
+    """ Quiet debug printing and check solved graphs are feasible (and maximum) flows
+    """
+
+    def setUp(self):
+        self.debug_print = max_flow_match._DEBUG_PRINT
+        max_flow_match._DEBUG_PRINT = False
+
+    def tearDown(self):
+        max_flow_match._DEBUG_PRINT = self.debug_print
+
+    def assertFeasible(self, schedule_graph):
+        """ Check capacity and conservation constraints of a solved graph
+        """
+        inflows = {}
+        for node_id in schedule_graph.nodes:
+            node = schedule_graph.nodes[node_id]
+            for edge in node.edges:
+                self.assertGreaterEqual(node.flows[edge], 0)
+                self.assertLessEqual(node.flows[edge], node.edges[edge])
+                inflows[edge] = inflows.get(edge, 0) + node.flows[edge]
+        for node_id in schedule_graph.nodes:
+            if node_id in (Graph.ID_SOURCE, Graph.ID_SINK):
+                continue
+            outflow = sum(schedule_graph.nodes[node_id].flows.values())
+            self.assertEqual(inflows.get(node_id, 0), outflow, node_id)
+
+    def assertMaximal(self, schedule_graph):
+        """ Check no augmenting path is left in a solved graph
+        (independent of the graph's own residuals, which are rebuilt from its edges and flows)
+        """
+        residuals = {}
+        for node_id in schedule_graph.nodes:
+            node = schedule_graph.nodes[node_id]
+            for edge in node.edges:
+                if node.edges[edge] - node.flows[edge] > 0:
+                    residuals.setdefault(node_id, set()).add(edge)
+                if node.flows[edge] > 0:
+                    residuals.setdefault(edge, set()).add(node_id)
+        reached = set([Graph.ID_SOURCE])
+        node_list = [Graph.ID_SOURCE]
+        while node_list:
+            for edge in residuals.get(node_list.pop(0), ()):
+                if edge not in reached:
+                    reached.add(edge)
+                    node_list.append(edge)
+        self.assertNotIn(Graph.ID_SINK, reached)
+
+
+class MaxFlowMatchDifferentialTest(FlowTestCase):
+    """ Check the flow engines against the reference Graph.edmonds_karp
+    """
+
+    def test_reference_returns_flow_value(self):
+        for seed in ROSTER_SEEDS:
+            matcher = MaxFlowMatch()
+            matcher.initialize_graph()
+            for shift_key, shift_candidates in generate_roster(seed):
+                matcher.add_to_graph(shift_key, shift_candidates)
+            total_capacity, flow_graph = matcher.schedule_graph.edmonds_karp(Graph.ID_SOURCE, Graph.ID_SINK)
+            self.assertEqual(total_capacity, flow_value(matcher.schedule_graph))
+
+    def test_engines_match_reference(self):
+        for seed in ROSTER_SEEDS:
+            shift_candidate_list = generate_roster(seed)
+            reference_graph = reference_solve(shift_candidate_list)
+            self.assertFeasible(reference_graph)
+            self.assertMaximal(reference_graph)
+            for engine_name in sorted(FLOW_ENGINES):
+                engine_graph = FLOW_ENGINES[engine_name](shift_candidate_list)
+                self.assertFeasible(engine_graph)
+                self.assertMaximal(engine_graph)
+                self.assertEqual(flow_value(engine_graph), flow_value(reference_graph),
+                                 'engine %s, seed %s' % (engine_name, seed))
+
+    def test_unsolved_graph_is_not_maximal(self):
+        matcher = MaxFlowMatch()
+        matcher.initialize_graph()
+        for shift_key, shift_candidates in generate_roster(0):
+            matcher.add_to_graph(shift_key, shift_candidates)
+        self.assertFeasible(matcher.schedule_graph)
+        with self.assertRaises(AssertionError):
+            self.assertMaximal(matcher.schedule_graph)
+
+    def test_components_are_independent(self):
+        for seed in ROSTER_SEEDS:
+            shift_candidate_list = generate_roster(seed)
+            component_list = MaxFlowMatch().find_components(shift_candidate_list)
+            employees = {}
+            for component_id, component in enumerate(component_list):
+                for shift_key, shift_candidates in component:
+                    for shift_candidate in shift_candidates:
+                        self.assertEqual(employees.setdefault(shift_candidate.employee, component_id), component_id)
+            self.assertEqual(sum(len(component) for component in component_list), len(shift_candidate_list))
+
+
+class HorizonDifferentialTest(FlowTestCase):
+    """ Check rolling window solves against a single solve of the whole time-expanded graph
+    """
+
+    def test_windows_match_reference(self):
+        for seed in ROSTER_SEEDS:
+            week_candidate_list = generate_horizon_roster(seed, WEEK_COUNT)
+            for horizon_hours in HORIZON_HOURS:
+                reference_graph = horizon_reference_solve(week_candidate_list, horizon_hours).schedule_graph
+                self.assertFeasible(reference_graph)
+                self.assertMaximal(reference_graph)
+                reference_flow = flow_value(reference_graph)
+                for window_weeks in xrange(1, WEEK_COUNT + 2):
+                    matcher = rolling_solve(week_candidate_list, window_weeks, horizon_hours)
+                    self.assertFeasible(matcher.schedule_graph)
+                    message = 'seed %s, horizon hours %s, window %s' % (seed, horizon_hours, window_weeks)
+                    # with the default horizon hours the weeks never compete, and a window covering every week
+                    #  is one cold solve, otherwise closing weeks early can only lose flow
+                    if horizon_hours is None or window_weeks >= WEEK_COUNT:
+                        self.assertEqual(flow_value(matcher.schedule_graph), reference_flow, message)
+                    else:
+                        self.assertLessEqual(flow_value(matcher.schedule_graph), reference_flow, message)
+
+    def test_horizon_hours_link_weeks(self):
+        horizon_hours = 56
+        capped = False
+        for seed in ROSTER_SEEDS:
+            week_candidate_list = generate_horizon_roster(seed, WEEK_COUNT)
+            # without a horizon cap the weeks are independent
+            week_flow = 0
+            for week in xrange(WEEK_COUNT):
+                week_flow += flow_value(reference_solve([(shift_key, shift_candidates)
+                                                         for shift_week, shift_key, shift_candidates
+                                                         in week_candidate_list if shift_week == week]))
+            for window_weeks in xrange(1, WEEK_COUNT + 1):
+                matcher = rolling_solve(week_candidate_list, window_weeks)
+                self.assertEqual(flow_value(matcher.schedule_graph), week_flow)
+
+                matcher = rolling_solve(week_candidate_list, window_weeks, horizon_hours)
+                for employee_key, hours in employee_hours(matcher).items():
+                    self.assertLessEqual(hours, horizon_hours, employee_key)
+                for candidate_key, employee_key in matcher.employee_keys.items():
+                    self.assertLessEqual(matcher.schedule_graph.nodes[candidate_key].flows[employee_key],
+                                         MaxFlowMatch.HOURS_WEEK)
+                self.assertLessEqual(flow_value(matcher.schedule_graph), week_flow)
+                capped = capped or flow_value(matcher.schedule_graph) < week_flow
+        self.assertTrue(capped)
+
+    def test_closed_weeks_are_final(self):
+        for seed in ROSTER_SEEDS:
+            week_candidate_list = generate_horizon_roster(seed, WEEK_COUNT)
+            for window_weeks in xrange(1, WEEK_COUNT):
+                # the first window only sees its own weeks, so later weeks must not move week 0 once it is closed
+                first_window = [shift_item for shift_item in week_candidate_list if shift_item[0] < window_weeks]
+                expected = rolling_solve(first_window, window_weeks, HORIZON_HOURS[-1])
+                actual = rolling_solve(week_candidate_list, window_weeks, HORIZON_HOURS[-1])
+                for week, shift_key, shift_candidates in week_candidate_list:
+                    if week != 0:
+                        continue
+                    self.assertEqual(actual.schedule_graph.nodes[shift_key].flows,
+                                     expected.schedule_graph.nodes[shift_key].flows,
+                                     'seed %s, window %s, shift %s' % (seed, window_weeks, shift_key))
+                    self.assertNotIn(shift_key, actual.schedule_graph.nodes[Graph.ID_SOURCE].residuals)
+
+    def test_flow_carried_between_windows(self):
+        for seed in ROSTER_SEEDS:
+            week_candidate_list = generate_horizon_roster(seed, WEEK_COUNT)
+            for window_weeks in xrange(1, WEEK_COUNT + 1):
+                matcher = MaxFlowMatch(workers=1, window_weeks=window_weeks, horizon_hours=HORIZON_HOURS[-1])
+                matcher.initialize_graph()
+                window_flows = []
+                solve_window = matcher.schedule_graph.max_flow
+
+                def recording_max_flow(source_node, target_node):
+                    before = flow_value(matcher.schedule_graph)
+                    result = solve_window(source_node, target_node)
+                    window_flows.append((before, flow_value(matcher.schedule_graph)))
+                    return result
+                matcher.schedule_graph.max_flow = recording_max_flow
+                matcher.solve_horizon(week_candidate_list, window_weeks)
+
+                # one solve per week, each starting from the flow the last one left
+                self.assertEqual(len(window_flows), WEEK_COUNT)
+                self.assertEqual(window_flows[0][0], 0)
+                for previous, current in zip(window_flows, window_flows[1:]):
+                    self.assertEqual(current[0], previous[1])
+                    self.assertGreaterEqual(current[1], current[0])
+                self.assertEqual(window_flows[-1][1], flow_value(matcher.schedule_graph))
+
+    def test_pool_matches_in_process(self):
+        for seed in ROSTER_SEEDS[:5]:
+            week_candidate_list = generate_horizon_roster(seed, WEEK_COUNT, facility_count=3)
+            for window_weeks in (1, 2):
+                expected = rolling_solve(week_candidate_list, window_weeks, HORIZON_HOURS[-1])
+                actual = rolling_solve(week_candidate_list, window_weeks, HORIZON_HOURS[-1], 2, 1)
+                self.assertFeasible(actual.schedule_graph)
+                self.assertEqual(flow_value(actual.schedule_graph), flow_value(expected.schedule_graph))
+                self.assertEqual(actual.employee_keys, expected.employee_keys)
+                self.assertEqual(employee_hours(actual), employee_hours(expected))
+
+
+class MaxFlowMatchFindTest(FlowTestCase):
+    """ Check the MaxFlowMatch entry points on the sample data
+    """
+
+    def find(self, matcher, open_shift_text=None):
+        with open(HIST_DATA_FILE) as hist_data_stream:
+            if open_shift_text is not None:
+                return matcher.find(hist_data_stream, StringIO(open_shift_text))
+            with open(OPEN_SHIFT_FILE) as open_shift_stream:
+                return matcher.find(hist_data_stream, open_shift_stream)
+
+    def find_and_write(self, matcher, output_format):
+        output_stream = StringIO()
+        with open(HIST_DATA_FILE) as hist_data_stream, open(OPEN_SHIFT_FILE) as open_shift_stream:
+            matcher.find_and_write(hist_data_stream, open_shift_stream, output_stream, output_format)
+        return output_stream.getvalue()
+
+    def test_find(self):
+        matcher = MaxFlowMatch(workers=1)
+        result = self.find(matcher)
+        self.assertFeasible(result.schedule_graph)
+        with open(OPEN_SHIFT_FILE) as open_shift_stream:
+            shift_count = len(matcher.read_shift_csv(open_shift_stream))
+        assignments = list(result.assignments())
+        self.assertEqual(len(assignments), shift_count)
+        self.assertEqual(sum(assignment.hours for assignment in assignments), flow_value(result.schedule_graph))
+        self.assertTrue(any(assignment.employee is not None for assignment in assignments))
+        for assignment in assignments:
+            if assignment.employee is None:
+                self.assertEqual((assignment.hours, assignment.score), (0, None))
+                continue
+            self.assertEqual(assignment.hours, MaxFlowMatch.HOURS_SHIFT)
+            # the score is the best search score the employee had for the shift
+            self.assertEqual(assignment.score, result.candidate_scores[assignment.shift][assignment.employee])
+            self.assertGreater(assignment.score, 0)
+
+    def test_find_again_keeps_result(self):
+        matcher = MaxFlowMatch(workers=1)
+        first_result = self.find(matcher)
+        first_assignments = list(first_result.assignments())
+        second_result = self.find(matcher)
+        self.assertIsNot(second_result.schedule_graph, first_result.schedule_graph)
+        self.assertEqual(list(first_result.assignments()), first_assignments)
+        self.assertEqual(list(second_result.assignments()), first_assignments)
+
+    def test_find_and_write(self):
+        assignments = list(self.find(MaxFlowMatch(workers=1)).assignments())
+
+        csv_rows = list(csv.reader(StringIO(self.find_and_write(MaxFlowMatch(workers=1), 'csv'))))
+        self.assertEqual(tuple(csv_rows[0]), ScheduleResult.CSV_COLUMNS)
+        self.assertEqual([tuple(row[:2]) for row in csv_rows[1:]],
+                         [(a.shift, a.employee or '') for a in assignments])
+
+        json_lines = self.find_and_write(MaxFlowMatch(workers=1), 'jsonl').splitlines()
+        self.assertEqual([Assignment(**json.loads(line)) for line in json_lines], assignments)
+
+    def test_find_and_write_rejects_unknown_format(self):
+        output_stream = StringIO()
+        with open(HIST_DATA_FILE) as hist_data_stream, open(OPEN_SHIFT_FILE) as open_shift_stream:
+            with self.assertRaises(ValueError):
+                MaxFlowMatch(workers=1).find_and_write(hist_data_stream, open_shift_stream, output_stream, 'xml')
+        self.assertEqual(output_stream.getvalue(), '')
+
+    def test_horizon_employee_keys(self):
+        week_count = 3
+        matcher = MaxFlowMatch(workers=1, window_weeks=1)
+        result = self.find(matcher, generate_open_shifts(week_count))
+        self.assertFeasible(result.schedule_graph)
+        assignments = list(result.assignments())
+        self.assertEqual(len(assignments), week_count * MaxFlowMatch.DAYS_WEEK * 3)
+        week_hours = {}
+        for assignment in assignments:
+            if assignment.employee is None:
+                continue
+            # capacity nodes (employee@week) are mapped back to the employee
+            self.assertNotIn('@w', assignment.employee)
+            self.assertIn(assignment.employee, result.candidate_scores[assignment.shift])
+            week = matcher.get_week(int(assignment.shift.split('-')[0]))
+            key = (assignment.employee, week)
+            week_hours[key] = week_hours.get(key, 0) + assignment.hours
+        self.assertTrue(week_hours)
+        for key in week_hours:
+            self.assertLessEqual(week_hours[key], MaxFlowMatch.HOURS_WEEK, key)
+        self.assertTrue(set(employee for employee, week in week_hours) <= set(result.employee_keys.values()))
+
+    def test_find_restores_debug_print(self):
+        stdout = sys.stdout
+        try:
+            for process_debug, matcher_debug in ((True, False), (False, True)):
+                max_flow_match.set_debug_print(process_debug)
+                sys.stdout = StringIO()
+                self.find(MaxFlowMatch(workers=1, debug=matcher_debug))
+                output = sys.stdout.getvalue()
+                sys.stdout = stdout
+                # the matcher decides what this solve prints, the process setting is left as it was
+                self.assertEqual('components:' in output, matcher_debug)
+                self.assertEqual(max_flow_match._DEBUG_PRINT, process_debug)
+        finally:
+            sys.stdout = stdout
+
+    def test_workers(self):
+        self.assertEqual(MaxFlowMatch().workers, multiprocessing.cpu_count())
+        for workers in (0, -1):
+            with self.assertRaises(ValueError):
+                MaxFlowMatch(workers)
+        matcher = MaxFlowMatch(1, debug=True)
+        matcher.PARALLEL_MIN_NODES = 1
+        # one worker solves in this process (the pool initializer would have turned debug printing on)
+        self.assertEqual(matcher.map_components(debug_print_enabled, [0, 1], [1, 1]), [False, False])
+
+    def test_debug_reaches_workers(self):
+        matcher = MaxFlowMatch(workers=2, debug=True)
+        matcher.PARALLEL_MIN_NODES = 1
+        self.assertEqual(matcher.map_components(debug_print_enabled, [0, 1], [1, 1]), [True, True])
+        self.assertFalse(max_flow_match._DEBUG_PRINT)
+
+
+class ScheduleResultTest(unittest.TestCase):
+    """ Check assignments are read from the solved graph without changing it
+    """
+
+    def test_assignments_cover_flow(self):
+        for seed in ROSTER_SEEDS:
+            shift_candidate_list = generate_roster(seed)
+            schedule_graph = reference_solve(shift_candidate_list)
+            result = ScheduleResult(schedule_graph, [shift_key for shift_key, shift_candidates in shift_candidate_list])
+            assignments = list(result.assignments())
+            self.assertEqual(len(assignments), len(shift_candidate_list))
+            self.assertEqual(sum(assignment.hours for assignment in assignments), flow_value(schedule_graph))
+            self.assertEqual(len(result.unfilled()), len([a for a in assignments if a.employee is None]))
+            # reading the result again gives the same assignments
+            self.assertEqual(list(result.assignments()), assignments)
+
+    def test_writers(self):
+        shift_candidate_list = generate_roster(0)
+        schedule_graph = reference_solve(shift_candidate_list)
+        result = ScheduleResult(schedule_graph, [shift_key for shift_key, shift_candidates in shift_candidate_list])
+        assignments = list(result.assignments())
+
+        csv_stream = StringIO()
+        result.write_csv(csv_stream)
+        csv_lines = csv_stream.getvalue().splitlines()
+        self.assertEqual(csv_lines[0], ','.join(ScheduleResult.CSV_COLUMNS))
+        self.assertEqual(len(csv_lines), len(assignments) + 1)
+
+        json_stream = StringIO()
+        result.write_json_lines(json_stream)
+        rows = [json.loads(line) for line in json_stream.getvalue().splitlines()]
+        self.assertEqual([(row['shift'], row['employee'], row['hours']) for row in rows],
+                         [(a.shift, a.employee, a.hours) for a in assignments])
+
+
+if __name__ == "__main__":
+    unittest.main()